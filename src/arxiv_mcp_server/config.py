@@ -13,6 +13,7 @@ class Settings(BaseSettings):
     MAX_RESULTS: int = 50
     BATCH_SIZE: int = 20
     REQUEST_TIMEOUT: int = 60
+    CITATION_CACHE_TTL: int = 7 * 24 * 60 * 60
     HOST: str = "0.0.0.0"
     PORT: int = 8000
     model_config = SettingsConfigDict(extra="allow")
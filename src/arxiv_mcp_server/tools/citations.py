@@ -1,19 +1,75 @@
 """Citation management functionality for the arXiv MCP server."""
 
 import arxiv
+import asyncio
+import httpx
 import json
 import logging
-from typing import Dict, Any, List, Optional
+import re
+import sqlite3
+import threading
+import time
+import xml.etree.ElementTree as ET
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, Any, Callable, List, Optional, Sequence, Tuple
 from dataclasses import dataclass
 from datetime import datetime
+from enum import IntEnum
 import mcp.types as types
 from ..config import Settings
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
 logger = logging.getLogger("arxiv-mcp-server")
 settings = Settings()
 
 # Define citation formats
-CITATION_FORMATS = ["apa", "mla", "chicago", "harvard", "ieee", "bibtex"]
+CITATION_FORMATS = ("apa", "mla", "chicago", "harvard", "ieee", "bibtex")
+_SUPPORTED_FORMATS_MSG = f"Supported formats: {', '.join(CITATION_FORMATS)}"
+
+
+class _Fmt(IntEnum):
+    """Canonical citation styles, numbered in CITATION_FORMATS order."""
+    APA = 0
+    MLA = 1
+    CHICAGO = 2
+    HARVARD = 3
+    IEEE = 4
+    BIBTEX = 5
+
+
+# Format names are mapped once at the request edge; a miss means unsupported
+_NAME_TO_FMT: Dict[str, _Fmt] = {name: _Fmt(i) for i, name in enumerate(CITATION_FORMATS)}
+
+# Current (2007+) and legacy arXiv identifiers, optionally versioned. Legacy
+# IDs are accepted without a subject class ("math/0309136", not
+# "math.GT/0309136"), matching the short IDs arXiv returns.
+_ARXIV_ID_RE = re.compile(
+    r"(?:\d{4}\.\d{4,5}|[a-z]+(?:-[a-z]+)*/\d{7})(?:v\d+)?"
+)
+
+_VERSION_RE = re.compile(r"v(\d+)$")
+
+# Stay under SQLite's bound-parameter limit in IN (...) lookups
+_CACHE_QUERY_CHUNK = 500
+
+# Shared arXiv client so successive lookups reuse its HTTP session
+_CLIENT: Optional[arxiv.Client] = None
+_CLIENT_LOCK = threading.Lock()
+# Lookups run in worker threads; arxiv.Client's rate limiting is not thread-safe
+_QUERY_LOCK = threading.Lock()
+
+# Direct Atom API access, bypassing the arxiv package's feedparser parsing
+_ARXIV_API_URL = "https://export.arxiv.org/api/query"
+_ATOM_NS = {"atom": "http://www.w3.org/2005/Atom"}
+_QUERY_INTERVAL = 3.0  # Seconds between API calls, per arXiv's terms of use
+_MAX_IDS_PER_QUERY = 2000  # arXiv's cap on entries returned by one call
+_HTTP_CLIENT: Optional[httpx.Client] = None
+_last_query = 0.0
 
 
 citation_tool = types.Tool(
@@ -23,13 +79,16 @@ citation_tool = types.Tool(
         "type": "object",
         "properties": {
             "paper_id": {
-                "type": "string",
-                "description": "The arXiv ID of the paper to cite"
+                "oneOf": [
+                    {"type": "string"},
+                    {"type": "array", "items": {"type": "string"}}
+                ],
+                "description": "The arXiv ID of the paper to cite, or a list of IDs to cite in one request"
             },
             "format": {
                 "type": "string",
                 "description": "Citation format to use",
-                "enum": CITATION_FORMATS,
+                "enum": list(CITATION_FORMATS),
                 "default": "apa"
             }
         },
@@ -38,152 +97,545 @@ citation_tool = types.Tool(
 )
 
 
-def format_authors(authors: List[str], format_type: str) -> str:
-    """Format author names according to citation style."""
-    if not authors:
+def _dumps(data: Dict[str, Any]) -> str:
+    """Serialize a response payload, using orjson when it is installed.
+
+    The stdlib fallback emits the same compact, unescaped UTF-8 as orjson.
+    """
+    if orjson is not None:
+        return orjson.dumps(data).decode()
+    return json.dumps(data, separators=(",", ":"), ensure_ascii=False)
+
+
+def _error_response(message: str) -> List[types.TextContent]:
+    """Build the tool response for a failed citation request."""
+    return [types.TextContent(
+        type="text",
+        text=_dumps({"status": "error", "message": message})
+    )]
+
+
+def _cache_path() -> Path:
+    """Get the location of the on-disk citation metadata cache."""
+    return Path(settings.STORAGE_PATH) / "citations.sqlite3"
+
+
+def _open_cache() -> Optional[sqlite3.Connection]:
+    """Open the metadata cache, creating its table if it is missing.
+
+    Returns:
+        Optional[sqlite3.Connection]: The connection, or None if the cache
+        is unavailable.
+    """
+    conn = None
+    try:
+        conn = sqlite3.connect(_cache_path())
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS arxiv_meta ("
+            "id TEXT PRIMARY KEY, blob TEXT NOT NULL, fetched_at REAL NOT NULL)"
+        )
+        return conn
+    except sqlite3.Error as e:
+        logger.warning(f"Citation cache unavailable: {str(e)}")
+        if conn is not None:
+            conn.close()
+        return None
+
+
+def _serialize_paper(paper: arxiv.Result) -> str:
+    """Serialize the metadata fields needed for citations."""
+    return json.dumps({
+        "title": paper.title,
+        "authors": [author.name for author in paper.authors],
+        "published": paper.published.isoformat(),
+        "entry_id": paper.entry_id,
+    })
+
+
+def _deserialize_paper(blob: str) -> arxiv.Result:
+    """Rebuild a paper from cached metadata."""
+    data = json.loads(blob)
+    return arxiv.Result(
+        entry_id=data["entry_id"],
+        published=datetime.fromisoformat(data["published"]),
+        title=data["title"],
+        authors=[arxiv.Result.Author(name) for name in data["authors"]],
+    )
+
+
+def _read_cache(conn: Optional[sqlite3.Connection], paper_ids: List[str]) -> Dict[str, arxiv.Result]:
+    """Look up cached metadata for several papers, ignoring expired entries.
+
+    Rows that cannot be decoded are treated as misses, so the next fetch
+    overwrites them.
+    """
+    if conn is None or not paper_ids:
+        return {}
+
+    rows = []
+    try:
+        for start in range(0, len(paper_ids), _CACHE_QUERY_CHUNK):
+            chunk = paper_ids[start:start + _CACHE_QUERY_CHUNK]
+            placeholders = ", ".join("?" * len(chunk))
+            rows += conn.execute(
+                f"SELECT id, blob, fetched_at FROM arxiv_meta WHERE id IN ({placeholders})",
+                chunk,
+            ).fetchall()
+    except sqlite3.Error as e:
+        logger.warning(f"Citation cache read failed: {str(e)}")
+        return {}
+
+    papers = {}
+    ttl = settings.CITATION_CACHE_TTL
+    now = time.time()
+    for paper_id, blob, fetched_at in rows:
+        if ttl > 0 and now - fetched_at > ttl:
+            continue
+        try:
+            papers[paper_id] = _deserialize_paper(blob)
+        except (ValueError, KeyError, TypeError) as e:
+            logger.warning(f"Ignoring unreadable cache entry for {paper_id}: {str(e)}")
+    return papers
+
+
+def _write_cache(conn: Optional[sqlite3.Connection], papers: Dict[str, arxiv.Result]) -> None:
+    """Store paper metadata in the cache."""
+    if conn is None or not papers:
+        return
+    now = time.time()
+    try:
+        with conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO arxiv_meta (id, blob, fetched_at) VALUES (?, ?, ?)",
+                [(paper_id, _serialize_paper(paper), now) for paper_id, paper in papers.items()],
+            )
+    except sqlite3.Error as e:
+        logger.warning(f"Citation cache write failed: {str(e)}")
+
+
+def _get_client() -> arxiv.Client:
+    """Get the shared arXiv client, creating it on first use."""
+    global _CLIENT
+    with _CLIENT_LOCK:
+        if _CLIENT is None:
+            # One page per fallback search chunk
+            _CLIENT = arxiv.Client(page_size=_MAX_IDS_PER_QUERY)
+        return _CLIENT
+
+
+def _get_http_client() -> httpx.Client:
+    """Get the shared HTTP client for direct API queries."""
+    global _HTTP_CLIENT
+    with _CLIENT_LOCK:
+        if _HTTP_CLIENT is None:
+            _HTTP_CLIENT = httpx.Client(timeout=settings.REQUEST_TIMEOUT)
+        return _HTTP_CLIENT
+
+
+def _parse_atom(xml_bytes: bytes) -> List[arxiv.Result]:
+    """Parse an arXiv API Atom feed into results carrying citation fields.
+
+    Only the ID, title, authors and publication date are extracted.
+    """
+    root = ET.fromstring(xml_bytes)
+    papers = []
+    for entry in root.iterfind("atom:entry", _ATOM_NS):
+        entry_id = entry.findtext("atom:id", "", _ATOM_NS).strip()
+        # arXiv reports problems such as malformed IDs as feed entries
+        if "arxiv.org/abs/" not in entry_id:
+            continue
+        try:
+            published = datetime.fromisoformat(entry.findtext("atom:published", "", _ATOM_NS).strip())
+        except ValueError:
+            logger.warning(f"Skipping arXiv entry {entry_id} without a valid publication date")
+            continue
+        title = entry.findtext("atom:title", "", _ATOM_NS)
+        papers.append(arxiv.Result(
+            entry_id=entry_id,
+            published=published,
+            title=re.sub(r"\s+", " ", title).strip(),
+            authors=[
+                arxiv.Result.Author(author.findtext("atom:name", "", _ATOM_NS).strip())
+                for author in entry.iterfind("atom:author", _ATOM_NS)
+            ],
+        ))
+    return papers
+
+
+def _wait_for_query_slot() -> None:
+    """Sleep until _QUERY_INTERVAL has passed since the last API call.
+
+    Must be called with _QUERY_LOCK held.
+    """
+    wait = _last_query + _QUERY_INTERVAL - time.monotonic()
+    if wait > 0:
+        time.sleep(wait)
+
+
+def _fetch_atom(paper_ids: List[str]) -> List[arxiv.Result]:
+    """Query the arXiv API for the given IDs and parse the Atom responses.
+
+    IDs are sent _MAX_IDS_PER_QUERY at a time, since arXiv returns at most
+    that many entries per call. Must be called with _QUERY_LOCK held.
+    """
+    global _last_query
+    papers = []
+    for start in range(0, len(paper_ids), _MAX_IDS_PER_QUERY):
+        chunk = paper_ids[start:start + _MAX_IDS_PER_QUERY]
+        _wait_for_query_slot()
+        try:
+            # POST keeps long ID lists in the body rather than the URL
+            response = _get_http_client().post(
+                _ARXIV_API_URL,
+                data={"id_list": ",".join(chunk), "max_results": len(chunk)},
+            )
+        finally:
+            _last_query = time.monotonic()
+        response.raise_for_status()
+        papers += _parse_atom(response.content)
+    return papers
+
+
+def _fetch_with_client(paper_ids: List[str]) -> List[arxiv.Result]:
+    """Look up papers through arxiv.Client, _MAX_IDS_PER_QUERY IDs per search.
+
+    Must be called with _QUERY_LOCK held.
+    """
+    global _last_query
+    client = _get_client()
+    papers = []
+    _wait_for_query_slot()
+    try:
+        for start in range(0, len(paper_ids), _MAX_IDS_PER_QUERY):
+            chunk = paper_ids[start:start + _MAX_IDS_PER_QUERY]
+            papers += client.results(arxiv.Search(id_list=chunk, max_results=len(chunk)))
+    finally:
+        _last_query = time.monotonic()
+    return papers
+
+
+def _split_version(paper_id: str) -> Tuple[str, int]:
+    """Split an arXiv ID into its base ID and version (0 if unversioned)."""
+    match = _VERSION_RE.search(paper_id)
+    if match is None:
+        return paper_id, 0
+    return paper_id[:match.start()], int(match.group(1))
+
+
+def _fetch_papers_cached(paper_ids: List[str]) -> Dict[str, arxiv.Result]:
+    """Fetch metadata for several papers, consulting the disk cache first.
+
+    Cache misses are resolved together, with one arXiv query per
+    _MAX_IDS_PER_QUERY IDs. Papers that do not exist on arXiv are absent
+    from the returned mapping.
+
+    Returns:
+        Dict[str, arxiv.Result]: Papers keyed by the requested ID.
+    """
+    conn = _open_cache()
+    try:
+        return _fetch_papers(conn, list(dict.fromkeys(paper_ids)))
+    finally:
+        if conn is not None:
+            conn.close()
+
+
+def _fetch_papers(conn: Optional[sqlite3.Connection], paper_ids: List[str]) -> Dict[str, arxiv.Result]:
+    """Resolve unique paper IDs through an open cache connection and arXiv."""
+    papers = _read_cache(conn, paper_ids)
+    misses = [paper_id for paper_id in paper_ids if paper_id not in papers]
+    if not misses:
+        return papers
+
+    with _QUERY_LOCK:
+        try:
+            results = _fetch_atom(misses)
+        except httpx.HTTPStatusError:
+            # arXiv answered and refused (e.g. 429/503); retrying through the
+            # arxiv client would only hit it again straight away
+            raise
+        except (httpx.HTTPError, ET.ParseError, ValueError) as e:
+            logger.warning(f"Direct arXiv query failed, using arxiv client: {str(e)}")
+            results = _fetch_with_client(misses)
+
+    # Exact IDs match first. arXiv answers an unversioned ID with its latest
+    # version, so those requests take the highest version returned.
+    wanted = set(misses)
+    found: Dict[str, arxiv.Result] = {}
+    latest: Dict[str, Tuple[int, arxiv.Result]] = {}
+    for paper in results:
+        short_id = paper.get_short_id()
+        if short_id in wanted:
+            found.setdefault(short_id, paper)
+        base, version = _split_version(short_id)
+        if base not in latest or version > latest[base][0]:
+            latest[base] = (version, paper)
+    for paper_id in misses:
+        if paper_id not in found and paper_id in latest and _split_version(paper_id)[1] == 0:
+            found[paper_id] = latest[paper_id][1]
+
+    _write_cache(conn, found)
+    papers.update(found)
+    return papers
+
+
+def _serial_join(authors: Sequence[str]) -> str:
+    """Join names as "A, B, and C" in one formatting pass."""
+    return f"{', '.join(authors[:-1])}, and {authors[-1]}"
+
+
+def _apa_authors(authors: Sequence[str], n: int) -> str:
+    """Format authors for APA: up to two names, then "et al."."""
+    if n == 1:
+        return authors[0]
+    elif n == 2:
+        return f"{authors[0]} & {authors[1]}"
+    else:
+        return f"{authors[0]} et al."
+
+
+def _mla_authors(authors: Sequence[str], n: int) -> str:
+    """Format authors for MLA: up to two names, then "et al."."""
+    if n == 1:
+        return authors[0]
+    elif n == 2:
+        return f"{authors[0]}, and {authors[1]}"
+    else:
+        return f"{authors[0]} et al."
+
+
+def _chicago_authors(authors: Sequence[str], n: int) -> str:
+    """Format authors for Chicago: up to seven names, then "et al."."""
+    if n == 1:
+        return authors[0]
+    elif n == 2:
+        return f"{authors[0]} and {authors[1]}"
+    elif n <= 7:
+        # Chicago style lists up to 7 authors
+        return _serial_join(authors)
+    else:
+        return f"{authors[0]} et al."
+
+
+def _harvard_authors(authors: Sequence[str], n: int) -> str:
+    """Format authors for Harvard: up to three names, then "et al."."""
+    if n == 1:
+        return authors[0]
+    elif n == 2:
+        return f"{authors[0]} and {authors[1]}"
+    elif n == 3:
+        return f"{authors[0]}, {authors[1]} and {authors[2]}"
+    else:
+        return f"{authors[0]} et al."
+
+
+def _ieee_authors(authors: Sequence[str], n: int) -> str:
+    """Format authors for IEEE, which lists every name."""
+    if n == 1:
+        return authors[0]
+    elif n == 2:
+        return f"{authors[0]} and {authors[1]}"
+    else:
+        # IEEE lists all authors
+        return _serial_join(authors)
+
+
+def _default_authors(authors: Sequence[str], n: int) -> str:
+    """Format authors as a plain comma-separated list."""
+    return ", ".join(authors)
+
+
+# Indexed by _Fmt; formatters receive the non-zero author count. BibTeX
+# builds its own author list.
+_AUTHOR_FORMATTERS: Tuple[Callable[[Sequence[str], int], str], ...] = (
+    _apa_authors,
+    _mla_authors,
+    _chicago_authors,
+    _harvard_authors,
+    _ieee_authors,
+    _default_authors,
+)
+
+
+def _format_authors(authors: Sequence[str], fmt: Optional[_Fmt]) -> str:
+    """Format author names for a canonical style (None for unknown styles)."""
+    n = len(authors)
+    if not n:
         return ""
     
-    if format_type == "apa":
-        if len(authors) == 1:
-            return authors[0]
-        elif len(authors) == 2:
-            return f"{authors[0]} & {authors[1]}"
-        else:
-            return f"{authors[0]} et al."
-    
-    elif format_type == "mla":
-        if len(authors) == 1:
-            return authors[0]
-        elif len(authors) == 2:
-            return f"{authors[0]}, and {authors[1]}"
-        else:
-            return f"{authors[0]} et al."
-    
-    elif format_type == "chicago":
-        if len(authors) == 1:
-            return authors[0]
-        elif len(authors) == 2:
-            return f"{authors[0]} and {authors[1]}"
-        elif len(authors) <= 7:
-            # Chicago style lists up to 7 authors
-            return ", ".join(authors[:-1]) + ", and " + authors[-1]
-        else:
-            return f"{authors[0]} et al."
-    
-    elif format_type == "harvard":
-        if len(authors) == 1:
-            return authors[0]
-        elif len(authors) == 2:
-            return f"{authors[0]} and {authors[1]}"
-        elif len(authors) == 3:
-            return f"{authors[0]}, {authors[1]} and {authors[2]}"
-        else:
-            return f"{authors[0]} et al."
-    
-    elif format_type == "ieee":
-        if len(authors) == 1:
-            return authors[0]
-        elif len(authors) == 2:
-            return f"{authors[0]} and {authors[1]}"
-        else:
-            # IEEE lists all authors
-            return ", ".join(authors[:-1]) + ", and " + authors[-1]
-    
-    # Default case
-    return ", ".join(authors)
+    formatter = _default_authors if fmt is None else _AUTHOR_FORMATTERS[fmt]
+    return formatter(authors, n)
+
+
+def format_authors(authors: Sequence[str], format_type: str) -> str:
+    """Format author names according to citation style."""
+    return _format_authors(authors, _NAME_TO_FMT.get(format_type))
+
+
+# English month names, independent of the process locale unlike strftime("%B")
+_MONTH_NAMES = (
+    "January", "February", "March", "April", "May", "June",
+    "July", "August", "September", "October", "November", "December",
+)
+
+
+@dataclass(frozen=True)
+class PaperFields:
+    """Paper metadata derived once and shared by every citation style."""
+    arxiv_id: str
+    title: str
+    authors: Tuple[str, ...]
+    authors_joined: str  # BibTeX author list
+    first_author_last: str  # Lowercased, used for the BibTeX key
+    year: int
+    month: str
+    url: str
+
+
+def extract_fields(paper: arxiv.Result) -> PaperFields:
+    """Extract the metadata needed to cite a paper."""
+    authors = tuple(author.name for author in paper.authors)
+    return PaperFields(
+        arxiv_id=paper.get_short_id(),
+        title=paper.title,
+        authors=authors,
+        authors_joined=" and ".join(authors),
+        first_author_last=authors[0].rstrip().rpartition(" ")[2].lower() if authors else "unknown",
+        year=paper.published.year,
+        month=_MONTH_NAMES[paper.published.month - 1],
+        url=paper.entry_id,
+    )
+
+
+# Citation templates, indexed by _Fmt. Placeholders are PaperFields
+# attributes, except {authors} (the style's author string) and {accessed}.
+_APA_TMPL = "{authors} ({year}). {title}. arXiv preprint arXiv:{arxiv_id}. {url}"
+_MLA_TMPL = "{authors}. \"{title}.\" arXiv, {month} {year}, {url}."
+_CHICAGO_TMPL = "{authors}. \"{title}.\" arXiv preprint arXiv:{arxiv_id} ({year}). {url}."
+_HARVARD_TMPL = "{authors}, {year}. {title}. arXiv:{arxiv_id}. Available at: {url} [Accessed {accessed}]."
+_IEEE_TMPL = "{authors}, \"{title},\" arXiv:{arxiv_id}, {year}."
+_BIBTEX_TMPL = (
+    "@article{{{first_author_last}{year},\n"
+    "  author = {{{authors_joined}}},\n"
+    "  title = {{{title}}},\n"
+    "  journal = {{arXiv preprint arXiv:{arxiv_id}}},\n"
+    "  year = {{{year}}},\n"
+    "  url = {{{url}}}\n"
+    "}}"
+)
+# Used when the citation style is not recognized
+_DEFAULT_TMPL = "{authors}. {title}. arXiv:{arxiv_id}, {year}. {url}"
+
+_TEMPLATES: Tuple[str, ...] = (
+    _APA_TMPL,
+    _MLA_TMPL,
+    _CHICAGO_TMPL,
+    _HARVARD_TMPL,
+    _IEEE_TMPL,
+    _BIBTEX_TMPL,
+)
+
+
+def _access_date(fmt: Optional[_Fmt]) -> str:
+    """Get the access date embedded in citations of the given style.
+
+    Only Harvard cites an access date; other styles get an empty string so
+    their memoized renderings stay valid across days.
+    """
+    return datetime.now().strftime('%d %B %Y') if fmt is _Fmt.HARVARD else ""
+
+
+def render(fields: PaperFields, format_type: str, accessed: Optional[str] = None) -> str:
+    """Render extracted paper fields in the specified citation format.
+
+    ``accessed`` defaults to today's date for styles that cite one; pass it
+    explicitly to share one date across many calls.
+    """
+    fmt = _NAME_TO_FMT.get(format_type)
+    if accessed is None:
+        accessed = _access_date(fmt)
+    return _render_cached(fields, fmt, accessed)
+
+
+@lru_cache(maxsize=1024)
+def _render_cached(fields: PaperFields, fmt: Optional[_Fmt], accessed: str) -> str:
+    """Render a citation, memoized on the full argument set."""
+    template = _DEFAULT_TMPL if fmt is None else _TEMPLATES[fmt]
+    ctx = vars(fields) | {
+        "authors": _format_authors(fields.authors, fmt),
+        "accessed": accessed,
+    }
+    return template.format_map(ctx)
 
 
 def generate_citation(paper: arxiv.Result, format_type: str) -> str:
     """Generate citation string for a paper in the specified format."""
-    # Extract common metadata
-    title = paper.title
-    authors = [author.name for author in paper.authors]
-    year = paper.published.year
-    month = paper.published.strftime("%B")
-    url = paper.entry_id
-    arxiv_id = paper.get_short_id()
-    
-    # Format authors based on citation style
-    formatted_authors = format_authors(authors, format_type)
-    
-    if format_type == "apa":
-        return f"{formatted_authors} ({year}). {title}. arXiv preprint arXiv:{arxiv_id}. {url}"
-    
-    elif format_type == "mla":
-        return f"{formatted_authors}. \"{title}.\" arXiv, {month} {year}, {url}."
-    
-    elif format_type == "chicago":
-        return f"{formatted_authors}. \"{title}.\" arXiv preprint arXiv:{arxiv_id} ({year}). {url}."
-    
-    elif format_type == "harvard":
-        return f"{formatted_authors}, {year}. {title}. arXiv:{arxiv_id}. Available at: {url} [Accessed {datetime.now().strftime('%d %B %Y')}]."
-    
-    elif format_type == "ieee":
-        return f"{formatted_authors}, \"{title},\" arXiv:{arxiv_id}, {year}."
-    
-    elif format_type == "bibtex":
-        # Create BibTeX entry
-        first_author_last = authors[0].split()[-1] if authors else "Unknown"
-        bibtex = f"@article{{{first_author_last.lower()}{year},\n"
-        bibtex += f"  author = {{{' and '.join(authors)}}},\n"
-        bibtex += f"  title = {{{title}}},\n"
-        bibtex += f"  journal = {{arXiv preprint arXiv:{arxiv_id}}},\n"
-        bibtex += f"  year = {{{year}}},\n"
-        bibtex += f"  url = {{{url}}}\n"
-        bibtex += "}"
-        return bibtex
-    
-    # If format is not recognized, return a default format
-    return f"{formatted_authors}. {title}. arXiv:{arxiv_id}, {year}. {url}"
+    return render(extract_fields(paper), format_type)
+
+
+def generate_citations_bulk(papers: Sequence[arxiv.Result], format_type: str) -> List[str]:
+    """Generate citations for many papers in one format.
+
+    The style lookup and access date are resolved once for the whole batch.
+    """
+    fmt = _NAME_TO_FMT.get(format_type)
+    accessed = _access_date(fmt)
+    return [_render_cached(extract_fields(paper), fmt, accessed) for paper in papers]
 
 
 async def handle_citation(arguments: Dict[str, Any]) -> List[types.TextContent]:
     """Handle citation formatting requests."""
     try:
         paper_id = arguments["paper_id"]
+        paper_ids = [paper_id] if isinstance(paper_id, str) else list(paper_id)
         format_type = arguments.get("format", "apa").lower()
         
         # Validate format type
-        if format_type not in CITATION_FORMATS:
+        fmt = _NAME_TO_FMT.get(format_type)
+        if fmt is None:
+            return _error_response(f"Unsupported citation format: {format_type}. {_SUPPORTED_FORMATS_MSG}")
+        
+        # Reject malformed IDs locally instead of asking arXiv about them
+        invalid = {pid for pid in paper_ids if not _ARXIV_ID_RE.fullmatch(pid)}
+        if isinstance(paper_id, str) and invalid:
+            return _error_response(f"Invalid arXiv ID: {paper_id}")
+        
+        # Fetch paper metadata
+        papers = await asyncio.to_thread(
+            _fetch_papers_cached, [pid for pid in paper_ids if pid not in invalid]
+        )
+        
+        if isinstance(paper_id, str):
+            if paper_id not in papers:
+                return _error_response(f"Paper {paper_id} not found on arXiv")
+            
             return [types.TextContent(
                 type="text",
-                text=json.dumps({
-                    "status": "error",
-                    "message": f"Unsupported citation format: {format_type}. Supported formats: {', '.join(CITATION_FORMATS)}"
+                text=_dumps({
+                    "status": "success",
+                    "paper_id": paper_id,
+                    "format": format_type,
+                    "citation": _render_cached(extract_fields(papers[paper_id]), fmt, _access_date(fmt))
                 })
             )]
         
-        # Fetch paper metadata
-        client = arxiv.Client()
-        paper = next(client.results(arxiv.Search(id_list=[paper_id])))
-        
-        # Generate citation
-        citation = generate_citation(paper, format_type)
-        
+        # Batch request: one entry per paper found, in request order
+        found = [pid for pid in paper_ids if pid in papers]
+        batch = generate_citations_bulk([papers[pid] for pid in found], format_type)
         return [types.TextContent(
             type="text",
-            text=json.dumps({
+            text=_dumps({
                 "status": "success",
-                "paper_id": paper_id,
                 "format": format_type,
-                "citation": citation
+                "citations": [
+                    {"paper_id": pid, "citation": citation}
+                    for pid, citation in zip(found, batch)
+                ],
+                "not_found": [pid for pid in paper_ids if pid not in papers and pid not in invalid],
+                "invalid": [pid for pid in paper_ids if pid in invalid]
             })
         )]
         
-    except StopIteration:
-        return [types.TextContent(
-            type="text",
-            text=json.dumps({
-                "status": "error",
-                "message": f"Paper {paper_id} not found on arXiv"
-            })
-        )]
     except Exception as e:
         logger.error(f"Citation error: {str(e)}")
-        return [types.TextContent(
-            type="text",
-            text=json.dumps({
-                "status": "error",
-                "message": f"Error: {str(e)}"
-            })
-        )]
\ No newline at end of file
+        return _error_response(f"Error: {str(e)}")
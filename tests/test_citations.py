@@ -1,9 +1,14 @@
 """Tests for citation management functionality."""
 
 import pytest
+import asyncio
+import httpx
 import json
+import sqlite3
+import time
 from unittest.mock import MagicMock, patch
-from src.arxiv_mcp_server.tools.citations import handle_citation, generate_citation
+from src.arxiv_mcp_server.tools import citations
+from src.arxiv_mcp_server.tools.citations import handle_citation, generate_citation, generate_citations_bulk, extract_fields, render
 
 
 # Mock data
@@ -11,7 +16,32 @@ class MockAuthor:
     def __init__(self, name):
         self.name = name
 
-@pytest.fixture
+@pytest.fixture(autouse=True)
+def isolated_citations(tmp_path, monkeypatch):
+    """Keep the citation cache and shared client from leaking between tests."""
+    monkeypatch.setattr(citations, "_cache_path", lambda: tmp_path / "citations.sqlite3")
+    monkeypatch.setattr(citations, "_CLIENT", None)
+    monkeypatch.setattr(citations, "_HTTP_CLIENT", None)
+    monkeypatch.setattr(citations, "_last_query", 0.0)
+    # Query spacing is asserted explicitly where it matters; never really wait
+    monkeypatch.setattr(citations.time, "sleep", lambda seconds: None)
+
+
+@pytest.fixture(autouse=True)
+def offline_atom(request, monkeypatch):
+    """Fail direct API queries so lookups go through the patched arxiv.Client.
+
+    Tests marked ``online_atom`` exercise ``_fetch_atom`` itself and opt out.
+    """
+    if request.node.get_closest_marker("online_atom"):
+        return
+
+    def _fail(paper_ids):
+        raise httpx.ConnectError("offline")
+    monkeypatch.setattr(citations, "_fetch_atom", _fail)
+
+
+@pytest.fixture(scope="module")
 def mock_arxiv_paper():
     mock_paper = MagicMock()
     mock_paper.title = "Understanding Deep Learning Requires Rethinking Generalization"
@@ -32,15 +62,30 @@ def mock_arxiv_paper():
     return mock_paper
 
 
+@pytest.fixture
+def shared_client(mock_arxiv_paper):
+    """Patch arxiv.Client so every query returns the mock paper."""
+    with patch('arxiv.Client') as mock_client:
+        mock_client.return_value.results.side_effect = lambda search: iter([mock_arxiv_paper])
+        yield mock_client
+
+
 @pytest.mark.asyncio
-@patch('arxiv.Client')
-async def test_handle_citation_apa_format(mock_client, mock_arxiv_paper):
-    # Configure mock
-    mock_instance = mock_client.return_value
-    mock_instance.results.return_value = iter([mock_arxiv_paper])
-    
-    # Test APA format
-    result = await handle_citation({"paper_id": "1611.03530", "format": "apa"})
+@pytest.mark.parametrize("fmt,expected", [
+    ("apa", [
+        "Zhang, Chiyuan et al. (2017)",
+        "Understanding Deep Learning Requires Rethinking Generalization",
+        "arXiv:1611.03530",
+    ]),
+    ("bibtex", [
+        "@article{",
+        "author = {Zhang, Chiyuan and Bengio, Samy and Hardt, Moritz and Recht, Benjamin and Vinyals, Oriol}",
+        "title = {Understanding Deep Learning Requires Rethinking Generalization}",
+        "year = {2017}",
+    ]),
+])
+async def test_handle_citation_format(shared_client, fmt, expected):
+    result = await handle_citation({"paper_id": "1611.03530", "format": fmt})
     
     # Check response format
     assert len(result) == 1
@@ -50,88 +95,375 @@ async def test_handle_citation_apa_format(mock_client, mock_arxiv_paper):
     response = json.loads(result[0].text)
     assert response["status"] == "success"
     assert response["paper_id"] == "1611.03530"
-    assert response["format"] == "apa"
-    assert "citation" in response
-    
-    # Verify citation format (APA style)
-    assert "Zhang, Chiyuan et al. (2017)" in response["citation"]
-    assert "Understanding Deep Learning Requires Rethinking Generalization" in response["citation"]
-    assert "arXiv:1611.03530" in response["citation"]
+    assert response["format"] == fmt
+    for substr in expected:
+        assert substr in response["citation"]
 
 
 @pytest.mark.asyncio
-@patch('arxiv.Client')
-async def test_handle_citation_bibtex_format(mock_client, mock_arxiv_paper):
-    # Configure mock
-    mock_instance = mock_client.return_value
-    mock_instance.results.return_value = iter([mock_arxiv_paper])
-    
-    # Test BibTeX format
-    result = await handle_citation({"paper_id": "1611.03530", "format": "bibtex"})
+async def test_handle_citation_invalid_format():
+    # Test invalid format; rejected before any lookup
+    result = await handle_citation({"paper_id": "1611.03530", "format": "invalid_format"})
     
     # Parse the JSON response
     response = json.loads(result[0].text)
-    assert response["status"] == "success"
-    
-    # Verify BibTeX format
-    assert "@article{" in response["citation"]
-    assert "author = {Zhang, Chiyuan and Bengio, Samy and Hardt, Moritz and Recht, Benjamin and Vinyals, Oriol}" in response["citation"]
-    assert "title = {Understanding Deep Learning Requires Rethinking Generalization}" in response["citation"]
-    assert "year = {2017}" in response["citation"]
+    assert response["status"] == "error"
+    assert "Unsupported citation format" in response["message"]
 
 
 @pytest.mark.asyncio
-@patch('arxiv.Client')
-async def test_handle_citation_invalid_format(mock_client, mock_arxiv_paper):
-    # Configure mock
-    mock_instance = mock_client.return_value
-    mock_instance.results.return_value = iter([mock_arxiv_paper])
+async def test_handle_citation_paper_not_found(shared_client):
+    # Configure mock to simulate paper not found
+    shared_client.return_value.results.side_effect = lambda search: iter([])
     
-    # Test invalid format
-    result = await handle_citation({"paper_id": "1611.03530", "format": "invalid_format"})
+    # Test paper not found
+    result = await handle_citation({"paper_id": "9999.99999"})
     
     # Parse the JSON response
     response = json.loads(result[0].text)
     assert response["status"] == "error"
-    assert "Unsupported citation format" in response["message"]
+    assert "not found on arXiv" in response["message"]
 
 
 @pytest.mark.asyncio
-@patch('arxiv.Client')
-async def test_handle_citation_paper_not_found(mock_client):
-    # Configure mock to simulate paper not found
-    mock_instance = mock_client.return_value
-    mock_instance.results.return_value = iter([])  # Empty iterator
-    
-    # Test paper not found
+async def test_handle_citation_invalid_id(shared_client):
+    # Malformed IDs are rejected without contacting arXiv
     result = await handle_citation({"paper_id": "non_existent_id"})
     
-    # Parse the JSON response
     response = json.loads(result[0].text)
     assert response["status"] == "error"
-    assert "not found on arXiv" in response["message"]
+    assert "Invalid arXiv ID" in response["message"]
+    shared_client.return_value.results.assert_not_called()
+
+
+@pytest.mark.parametrize("paper_id", ["1611.03530", "2401.12345v2", "hep-th/9901001", "math/0309136v1"])
+def test_arxiv_id_pattern_accepts_valid_ids(paper_id):
+    assert citations._ARXIV_ID_RE.fullmatch(paper_id)
+
+
+@pytest.mark.parametrize("paper_id", ["1611.03530\n", "math.GT/0309136", "1611.035", "arXiv:1611.03530"])
+def test_arxiv_id_pattern_rejects_malformed_ids(paper_id):
+    assert not citations._ARXIV_ID_RE.fullmatch(paper_id)
+
+
+@pytest.mark.asyncio
+async def test_handle_citation_uses_cache(shared_client):
+    first = json.loads((await handle_citation({"paper_id": "1611.03530", "format": "apa"}))[0].text)
+    second = json.loads((await handle_citation({"paper_id": "1611.03530", "format": "mla"}))[0].text)
+
+    # Only the first format pays for the arXiv lookup
+    assert shared_client.return_value.results.call_count == 1
+    assert first["status"] == "success"
+    assert second["status"] == "success"
+    assert "Understanding Deep Learning Requires Rethinking Generalization" in second["citation"]
+
+
+@pytest.mark.asyncio
+async def test_handle_citation_ignores_corrupt_cache_entry(shared_client):
+    conn = citations._open_cache()
+    with conn:
+        conn.execute(
+            "INSERT INTO arxiv_meta (id, blob, fetched_at) VALUES (?, ?, ?)",
+            ("1611.03530", "{not json", time.time()),
+        )
+    conn.close()
+
+    response = json.loads((await handle_citation({"paper_id": "1611.03530"}))[0].text)
+    assert response["status"] == "success"
+    assert shared_client.return_value.results.call_count == 1
+
+    # The unreadable row was replaced, so the next lookup is a cache hit
+    await handle_citation({"paper_id": "1611.03530"})
+    assert shared_client.return_value.results.call_count == 1
+
+
+def test_open_cache_recreates_deleted_cache(tmp_path):
+    conn = citations._open_cache()
+    conn.close()
+    (tmp_path / "citations.sqlite3").unlink()
+
+    conn = citations._open_cache()
+    assert conn.execute("SELECT COUNT(*) FROM arxiv_meta").fetchone() == (0,)
+    conn.close()
+
+
+@patch('sqlite3.connect', wraps=sqlite3.connect)
+def test_fetch_papers_cached_uses_one_connection(mock_connect, shared_client):
+    citations._fetch_papers_cached(["1611.03530", "2401.00001", "2401.00002"])
+    papers = citations._fetch_papers_cached(["1611.03530", "2401.00001"])
+
+    assert list(papers) == ["1611.03530"]
+    assert mock_connect.call_count == 2
+
+
+@pytest.mark.asyncio
+async def test_handle_citation_batch(shared_client, mock_arxiv_paper):
+    second_paper = MagicMock()
+    second_paper.title = "Attention Is All You Need"
+    second_paper.authors = [MockAuthor("Vaswani, Ashish")]
+    second_paper.entry_id = "http://arxiv.org/abs/1706.03762v7"
+    second_paper.get_short_id.return_value = "1706.03762v7"
+    second_paper.published = mock_arxiv_paper.published
+
+    mock_instance = shared_client.return_value
+    mock_instance.results.side_effect = lambda search: iter([mock_arxiv_paper, second_paper])
+
+    result = await handle_citation({
+        "paper_id": ["1611.03530", "1706.03762", "2401.00000", "not-an-id"],
+        "format": "apa"
+    })
+
+    # All IDs are resolved with a single arXiv query
+    assert mock_instance.results.call_count == 1
+    search = mock_instance.results.call_args[0][0]
+    assert search.id_list == ["1611.03530", "1706.03762", "2401.00000"]
+
+    response = json.loads(result[0].text)
+    assert response["status"] == "success"
+    assert [c["paper_id"] for c in response["citations"]] == ["1611.03530", "1706.03762"]
+    assert "Vaswani, Ashish (2017)" in response["citations"][1]["citation"]
+    assert response["not_found"] == ["2401.00000"]
+    assert response["invalid"] == ["not-an-id"]
+
+
+def _versioned_paper(version, title):
+    paper = MagicMock()
+    paper.title = title
+    paper.authors = [MockAuthor("Zhang, Chiyuan")]
+    paper.entry_id = f"http://arxiv.org/abs/1611.03530v{version}"
+    paper.get_short_id.return_value = f"1611.03530v{version}"
+    import datetime
+    paper.published = datetime.datetime(2016, 11, 10)
+    return paper
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("order", [(1, 2), (2, 1)])
+async def test_handle_citation_batch_versioned_and_bare_ids(shared_client, order):
+    papers = {1: _versioned_paper(1, "First Version"), 2: _versioned_paper(2, "Latest Version")}
+    mock_instance = shared_client.return_value
+    mock_instance.results.side_effect = lambda search: iter([papers[v] for v in order])
 
+    request = {"paper_id": ["1611.03530", "1611.03530v1"], "format": "apa"}
+    for _ in range(2):  # The second pass is served from the disk cache
+        response = json.loads((await handle_citation(request))[0].text)
+        assert response["not_found"] == []
+        citations_by_id = {c["paper_id"]: c["citation"] for c in response["citations"]}
+        assert "Latest Version" in citations_by_id["1611.03530"]
+        assert "First Version" in citations_by_id["1611.03530v1"]
 
-def test_generate_citation_formats(mock_arxiv_paper):
+    assert mock_instance.results.call_count == 1
+
+
+@pytest.mark.asyncio
+async def test_handle_citation_reuses_client(shared_client):
+    await handle_citation({"paper_id": "1611.03530"})
+    await handle_citation({"paper_id": "1611.03530v2"})
+
+    # Both lookups go to arXiv through the same client instance
+    shared_client.assert_called_once_with(page_size=citations._MAX_IDS_PER_QUERY)
+    assert shared_client.return_value.results.call_count == 2
+
+
+@pytest.mark.asyncio
+async def test_handle_citation_concurrent_requests(shared_client):
+    shared_client.return_value.results.side_effect = lambda search: iter([
+        _versioned_paper(int(search.id_list[0][-1]), "Understanding Deep Learning")
+    ])
+
+    results = await asyncio.gather(*(
+        handle_citation({"paper_id": paper_id})
+        for paper_id in ["1611.03530v1", "1611.03530v2", "1611.03530v3"]
+    ))
+
+    for result in results:
+        assert json.loads(result[0].text)["status"] == "success"
+    assert shared_client.call_count == 1
+
+
+@pytest.mark.parametrize("format_type,expected", [
+    ("apa", "(2017)"),
+    ("mla", "arXiv,"),
+    ("chicago", "arXiv preprint"),
+    ("harvard", "2017."),
+    ("ieee", "\"Understanding Deep Learning Requires Rethinking Generalization,\""),
+    ("bibtex", "@article{"),
+    ("bibtex", "author ="),
+    ("bibtex", "title ="),
+])
+def test_generate_citation_formats(mock_arxiv_paper, format_type, expected):
     """Test that all citation formats are generated correctly."""
-    formats = ["apa", "mla", "chicago", "harvard", "ieee", "bibtex"]
-    
-    for format_type in formats:
-        citation = generate_citation(mock_arxiv_paper, format_type)
-        assert citation  # Citation should not be empty
-        
-        # Basic checks for each format
-        if format_type == "apa":
-            assert "(2017)" in citation
-        elif format_type == "mla":
-            assert "arXiv," in citation
-        elif format_type == "chicago":
-            assert "arXiv preprint" in citation
-        elif format_type == "harvard":
-            assert "2017." in citation
-        elif format_type == "ieee":
-            assert "\"Understanding Deep Learning Requires Rethinking Generalization,\"" in citation
-        elif format_type == "bibtex":
-            assert "@article{" in citation
-            assert "author =" in citation
-            assert "title =" in citation
\ No newline at end of file
+    citation = generate_citation(mock_arxiv_paper, format_type)
+    assert expected in citation
+
+
+def test_generate_citation_memoized(mock_arxiv_paper):
+    """Repeated (paper, format) pairs are served from the in-process cache."""
+    first = generate_citation(mock_arxiv_paper, "ieee")
+    hits = citations._render_cached.cache_info().hits
+    assert generate_citation(mock_arxiv_paper, "ieee") == first
+    assert citations._render_cached.cache_info().hits == hits + 1
+
+
+def test_render_reuses_extracted_fields(mock_arxiv_paper):
+    """Fields extracted once can be rendered in every style."""
+    fields = extract_fields(mock_arxiv_paper)
+    assert fields.first_author_last == "chiyuan"
+    for format_type in citations.CITATION_FORMATS:
+        assert render(fields, format_type) == generate_citation(mock_arxiv_paper, format_type)
+
+
+def test_format_tables_cover_every_style():
+    assert [citations._NAME_TO_FMT[name] for name in citations.CITATION_FORMATS] == list(citations._Fmt)
+    assert len(citations._TEMPLATES) == len(citations._Fmt)
+    assert len(citations._AUTHOR_FORMATTERS) == len(citations._Fmt)
+
+
+def test_generate_citations_bulk(mock_arxiv_paper):
+    batch = generate_citations_bulk([mock_arxiv_paper, mock_arxiv_paper], "mla")
+    assert batch == [generate_citation(mock_arxiv_paper, "mla")] * 2
+    assert "arXiv, February 2017" in batch[0]
+
+
+@pytest.mark.parametrize("use_orjson", [True, False])
+def test_dumps_matches_stdlib_json(use_orjson, monkeypatch):
+    if not use_orjson:
+        monkeypatch.setattr(citations, "orjson", None)
+    elif citations.orjson is None:
+        pytest.skip("orjson is not installed")
+
+    payload = {"status": "success", "citation": "Gödel, Kurt \"Über\" {x}"}
+    assert citations._dumps(payload) == '{"status":"success","citation":"Gödel, Kurt \\"Über\\" {x}"}'
+
+
+ATOM_FEED = b"""<?xml version="1.0" encoding="UTF-8"?>
+<feed xmlns="http://www.w3.org/2005/Atom">
+  <entry>
+    <id>http://arxiv.org/abs/1611.03530v2</id>
+    <published>2016-11-10T22:02:36Z</published>
+    <title>Understanding deep learning requires
+  rethinking generalization</title>
+    <author><name>Chiyuan Zhang</name></author>
+    <author><name>Samy Bengio</name></author>
+  </entry>
+  <entry>
+    <id>http://arxiv.org/api/errors#incorrect_id_format_for_bogus</id>
+    <title>Error</title>
+  </entry>
+</feed>"""
+
+
+def test_parse_atom():
+    papers = citations._parse_atom(ATOM_FEED)
+
+    # Error entries are skipped
+    assert len(papers) == 1
+    paper = papers[0]
+    assert paper.get_short_id() == "1611.03530v2"
+    assert paper.title == "Understanding deep learning requires rethinking generalization"
+    assert [author.name for author in paper.authors] == ["Chiyuan Zhang", "Samy Bengio"]
+    assert paper.published.year == 2016
+
+
+@pytest.mark.asyncio
+async def test_handle_citation_direct_atom_query(shared_client, monkeypatch):
+    monkeypatch.setattr(citations, "_fetch_atom", lambda paper_ids: citations._parse_atom(ATOM_FEED))
+
+    result = await handle_citation({"paper_id": "1611.03530", "format": "bibtex"})
+
+    response = json.loads(result[0].text)
+    assert response["status"] == "success"
+    assert "@article{zhang2016," in response["citation"]
+    shared_client.assert_not_called()
+
+
+@pytest.mark.online_atom
+def test_fetch_atom_sends_ids_in_one_request(monkeypatch):
+    requests = []
+
+    def handler(request):
+        requests.append(request)
+        return httpx.Response(200, content=ATOM_FEED)
+
+    monkeypatch.setattr(citations, "_HTTP_CLIENT", httpx.Client(transport=httpx.MockTransport(handler)))
+
+    paper_ids = [f"2401.{n:05d}" for n in range(500)]
+    papers = citations._fetch_atom(paper_ids)
+
+    assert len(requests) == 1
+    assert requests[0].method == "POST"
+    body = dict(httpx.QueryParams(requests[0].content.decode()))
+    assert body["id_list"] == ",".join(paper_ids)
+    assert body["max_results"] == "500"
+    assert papers[0].get_short_id() == "1611.03530v2"
+
+
+@pytest.mark.online_atom
+def test_fetch_atom_chunks_at_api_limit(monkeypatch):
+    requests = []
+
+    def handler(request):
+        requests.append(dict(httpx.QueryParams(request.content.decode())))
+        return httpx.Response(200, content=ATOM_FEED)
+
+    monkeypatch.setattr(citations, "_HTTP_CLIENT", httpx.Client(transport=httpx.MockTransport(handler)))
+    monkeypatch.setattr(citations, "_MAX_IDS_PER_QUERY", 2)
+
+    papers = citations._fetch_atom(["2401.00001", "2401.00002", "2401.00003"])
+
+    assert [r["id_list"] for r in requests] == ["2401.00001,2401.00002", "2401.00003"]
+    assert [r["max_results"] for r in requests] == ["2", "1"]
+    assert len(papers) == 2
+
+
+def test_parse_atom_skips_entry_without_valid_date():
+    bad_entry = b"""<entry>
+    <id>http://arxiv.org/abs/1706.03762v7</id>
+    <published>not a date</published>
+    <title>Attention Is All You Need</title>
+  </entry>
+</feed>"""
+    papers = citations._parse_atom(ATOM_FEED.replace(b"</feed>", bad_entry))
+    assert [paper.get_short_id() for paper in papers] == ["1611.03530v2"]
+
+
+def test_parse_atom_missing_title():
+    feed = ATOM_FEED.replace(b"""<title>Understanding deep learning requires
+  rethinking generalization</title>""", b"")
+    assert citations._parse_atom(feed)[0].title == ""
+
+
+def test_fetch_falls_back_after_query_interval(shared_client, monkeypatch):
+    sleeps = []
+    monkeypatch.setattr(citations.time, "sleep", sleeps.append)
+    monkeypatch.setattr(citations, "_last_query", time.monotonic())
+
+    papers = citations._fetch_papers_cached(["1611.03530"])
+
+    # The arxiv client is only used once the query interval has elapsed
+    assert list(papers) == ["1611.03530"]
+    assert len(sleeps) == 1
+    assert 0 < sleeps[0] <= citations._QUERY_INTERVAL
+
+
+def test_fetch_fallback_chunks_at_api_limit(shared_client, monkeypatch):
+    mock_instance = shared_client.return_value
+    mock_instance.results.side_effect = lambda search: iter([])
+    monkeypatch.setattr(citations, "_MAX_IDS_PER_QUERY", 2)
+
+    citations._fetch_papers_cached(["2401.00001", "2401.00002", "2401.00003"])
+
+    searches = [call[0][0] for call in mock_instance.results.call_args_list]
+    assert [search.id_list for search in searches] == [["2401.00001", "2401.00002"], ["2401.00003"]]
+    assert [search.max_results for search in searches] == [2, 1]
+
+
+def test_fetch_does_not_fall_back_on_http_status_error(shared_client, monkeypatch):
+    def _refuse(paper_ids):
+        request = httpx.Request("POST", citations._ARXIV_API_URL)
+        raise httpx.HTTPStatusError("busy", request=request, response=httpx.Response(503, request=request))
+    monkeypatch.setattr(citations, "_fetch_atom", _refuse)
+
+    with pytest.raises(httpx.HTTPStatusError):
+        citations._fetch_papers_cached(["1611.03530"])
+    shared_client.return_value.results.assert_not_called()